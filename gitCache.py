@@ -22,6 +22,122 @@ CacheEntry = collections.namedtuple('CacheEntry',
     ]
 )
 
+# the mode of a sparse directory entry, an out-of-cone directory collapsed to a single tree entry in the cache
+SPARSE_DIR_MODE = 0o40000
+
+def getSparseCone():
+    """
+        Description:
+            Reads the cone-mode sparse patterns from .git/info/sparse-checkout.
+            The cone directories are the positive directory patterns (/dir/) 
+            that are not followed by their negative pattern (!/dir/*/), which only marks the parents of a cone directory.
+        Parameters:
+            None.
+        Return:
+            cone (set): set of the cone directories paths, or None if the sparse checkout isn't enabled.
+    """
+    # if the sparse-checkout file doesn't exist -> the whole tree is in the cone
+    try:
+        data = readFile(os.path.join('.git', 'info', 'sparse-checkout')).decode()
+    except FileNotFoundError:
+        return None
+
+    included = set()
+    excluded = set()
+    for line in data.splitlines():
+        line = line.strip()
+
+        # skip the empty lines, comments, and the root patterns (/* and !/*/)
+        if not line or line.startswith('#') or line in ['/*', '!/*/']:
+            continue
+
+        if line.startswith('!') and line.endswith('/*/'):
+            excluded.add(line[1:-3].strip('/'))
+        elif not line.startswith('!') and line.endswith('/') and '*' not in line:
+            included.add(line.strip('/'))
+
+    return included - excluded
+
+def writeSparseCone(cone):
+    """
+        Description:
+            Writes the cone directories to .git/info/sparse-checkout in the cone-mode patterns format.
+        Parameters:
+            cone (list): list of the cone directories paths.
+        Return:
+            None.
+    """
+    cone = sorted(set(d.replace('\\', '/').strip('/') for d in cone))
+
+    # the parents of the cone directories, only their immediate files are in the cone
+    parents = set()
+    for directory in cone:
+        parts = directory.split('/')
+        for i in range(1, len(parts)):
+            parents.add('/'.join(parts[:i]))
+
+    lines = ['/*', '!/*/']
+    for directory in sorted(parents | set(cone)):
+        lines.append('/{}/'.format(directory))
+        if directory in parents and directory not in cone:
+            lines.append('!/{}/*/'.format(directory))
+
+    os.makedirs(os.path.join('.git', 'info'), exist_ok=True)
+    writeFile(os.path.join('.git', 'info', 'sparse-checkout'), ('\n'.join(lines) + '\n').encode())
+
+def isConeDir(directory, cone):
+    """
+        Description:
+            Checks if a directory has to be walked with the sparse cone,
+            which is a cone directory, a directory inside one, or a parent of one.
+        Parameters:
+            directory (string): the directory path relative to the repository root.
+            cone (set): the cone directories, None if the sparse checkout isn't enabled.
+        Return:
+            (boolean): true if the directory is walked, otherwise false.
+    """
+    if cone is None or directory in ['', '.']:
+        return True
+
+    for d in cone:
+        if directory == d or directory.startswith(d + '/') or d.startswith(directory + '/'):
+            return True
+    return False
+
+def isInCone(path, cone):
+    """
+        Description:
+            Checks if a file path is inside the sparse cone.
+            The files at the root, inside a cone directory, or directly inside a parent of one are in the cone.
+        Parameters:
+            path (string): the file path relative to the repository root.
+            cone (set): the cone directories, None if the sparse checkout isn't enabled.
+        Return:
+            (boolean): true if the path is in the cone, otherwise false.
+    """
+    if cone is None:
+        return True
+
+    parent = os.path.dirname(path)
+    if not parent:
+        return True
+
+    for d in cone:
+        if path.startswith(d + '/') or d == parent or d.startswith(parent + '/'):
+            return True
+    return False
+
+def isSparseDir(entry):
+    """
+        Description:
+            Checks if a cache entry is a sparse directory entry.
+        Parameters:
+            entry (CacheEntry): the cache entry.
+        Return:
+            (boolean): true if the entry is a collapsed directory, otherwise false.
+    """
+    return entry.mode == SPARSE_DIR_MODE
+
 def getCache():
     """
         Description:
@@ -77,6 +193,7 @@ def listFiles(quiet=False):
     """
         Description:
             Displays all the files paths from the cache.
+            With a sparse checkout, only the files in the cone are listed, the collapsed directories are skipped.
         Parameters:
             [quiet] (boolean):  optional parameter, true by default
                                 if print = true -> print the entries paths to the screen
@@ -93,8 +210,15 @@ def listFiles(quiet=False):
     if not cache:
         print('Git index is empty')
     
+    # get the sparse cone, None if the sparse checkout isn't enabled
+    cone = getSparseCone()
+
     # for each entry in the cache => print the entry path
     for entry in cache:
+        # skip the collapsed directories and the entries outside the sparse cone
+        if isSparseDir(entry) or not isInCone(entry.path, cone):
+            continue
+
         if not quiet:
             print(entry.path)
         files.append(entry.path)
@@ -116,10 +240,22 @@ def getWorkdirState(path = '.'):
                 - deleted   => the list of deleted files
     """
     
+    # get the sparse cone, None if the sparse checkout isn't enabled
+    cone = getSparseCone()
+
     directory_files = set()
     for root, dirs, files in os.walk(path):
         dirs[:] = [d for d in dirs if d != '.git']
 
+        # don't walk the directories outside the sparse cone
+        if cone is not None:
+            root_path = root.replace('\\', '/')
+            if root_path.startswith('./'):
+                root_path = root_path[2:]
+            elif root_path == '.':
+                root_path = ''
+            dirs[:] = [d for d in dirs if isConeDir(root_path + '/' + d if root_path else d, cone)]
+
         for file in files:
             path = os.path.join(root, file)
             
@@ -130,10 +266,11 @@ def getWorkdirState(path = '.'):
             if path.startswith('./'):
                 path = path[2:]
             
-            directory_files.add(path)
+            if isInCone(path, cone):
+                directory_files.add(path)
     
-    # get the cache entries paths
-    entries_dict = {e.path: e for e in getCache()}
+    # get the cache entries paths, excluding the collapsed directories and the entries outside the sparse cone
+    entries_dict = {e.path: e for e in getCache() if not isSparseDir(e) and isInCone(e.path, cone)}
     cache_entries_files = set(entries_dict)
 
     # get list of the new files, by subtracting directory files list from the files in the cache
@@ -1,12 +1,24 @@
 import os
 
+import re
+
 import time 
 
+import multiprocessing
+
+# the regex parser, sre_parse is deprecated since python 3.11
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
 from helpers import *
 
-from gitCache import getWorkdirState, getCache, CacheEntry, writeCache
+from gitCache import getWorkdirState, getCache, CacheEntry, writeCache, getSparseCone, writeSparseCone, isInCone, isSparseDir
 
-from gitObjects import generate_object_hash, getCommitHash, writeTree
+from gitObjects import generate_object_hash, getCommitHash, writeTree, sparseIndex, getObject, getTreeFiles
 
 
 def init(path = '.'):
@@ -86,24 +98,67 @@ def add(files):
     # for windows, replace '\\' with '/'
     files = [path.replace('\\', '/') for path in files]
 
+    # if any of the files is outside the sparse cone -> raise an exception.
+    cone = getSparseCone()
+    outside = [file for file in files if not isInCone(file, cone)]
+    if outside:
+        raise Exception('The paths are outside the sparse-checkout cone: %s' % ', '.join(outside))
+
     cache_entries = getCache()
 
     entries = [entry for entry in cache_entries if entry.path not in files]
 
     for file in files:
-        hash = generate_object_hash(readFile(file), 'blob')
+        hash = generate_object_hash(readFile(file), 'blob', write=True)
         st = os.stat(file)
         flags = len(file.encode())
 
         entry = CacheEntry(
-                int(st.st_ctime), 0, int(st.st_mtime), 0, st.st_dev,
-                st.st_ino, st.st_mode, st.st_uid, st.st_gid, st.st_size,
+                st.st_ctime_ns // 10**9, st.st_ctime_ns % 10**9,
+                st.st_mtime_ns // 10**9, st.st_mtime_ns % 10**9, st.st_dev,
+                st.st_ino & 0xFFFFFFFF, st.st_mode, st.st_uid, st.st_gid, st.st_size,
                 bytes.fromhex(hash), flags, file)
         entries.append(entry)
     
     writeCache(entries)
     for file in files:
         print("Added " , file, " to the staging area.")
+
+def sparseCheckout(action, directories=None):
+    """
+        Description:
+            Manages the cone of the sparse checkout, and collapses the directories outside it in the index.
+        Parameters:
+            action (string): one of (set, list, disable).
+                - set       => set the cone to the directories, and collapse the index to it.
+                - list      => print the cone directories.
+                - disable   => remove the cone, and expand the index.
+            [directories] (list): list of the cone directories for the set action.
+        Return:
+            None.
+    """
+    if action == 'set':
+        writeSparseCone(directories or [])
+        writeCache(sparseIndex(getCache(), getSparseCone()))
+
+    elif action == 'list':
+        cone = getSparseCone()
+        if cone is None:
+            print('Sparse checkout is not enabled.')
+        else:
+            for directory in sorted(cone):
+                print(directory)
+
+    elif action == 'disable':
+        writeCache(sparseIndex(getCache()))
+        try:
+            os.remove(os.path.join('.git', 'info', 'sparse-checkout'))
+        except FileNotFoundError:
+            pass
+
+    else:
+        raise Exception('Unexpected sparse-checkout action %s' % action)
+
 def commit(msg, author):
     """
         Description:
@@ -114,7 +169,7 @@ def commit(msg, author):
         Return:
             None.
     """   
-    tree = writeTree()
+    tree = writeTree(write=True)
     parent = getCommitHash()
     timestamp = int(time.mktime(time.localtime()))
     utc_offset = -time.timezone
@@ -134,11 +189,165 @@ def commit(msg, author):
     lines.append('')
     data = '\n'.join(lines).encode()
 
-    obj_hash = generate_object_hash(data, 'commit')
+    obj_hash = generate_object_hash(data, 'commit', write=True)
 
     master_path = os.path.join('.git', 'refs', 'heads', 'master')
 
     writeFile(master_path, (obj_hash + '\n').encode())
     print('committed ', obj_hash, ' to master.')
 
-    return obj_hash
\ No newline at end of file
+    return obj_hash
+
+# below this number of files, starting the worker processes costs more than searching the files serially
+GREP_PARALLEL_MIN_FILES = 64
+
+def grepLiteral(pattern):
+    """
+        Description:
+            Gets the longest literal string that every match of a regex pattern must contain.
+            The literal is built from the consecutive literal characters at the top level of the parsed pattern.
+        Parameters:
+            pattern (bytes): the regex pattern.
+        Return:
+            literal (bytes): the longest required literal, or b'' if there is none.
+    """
+    parsed = sre_parse.parse(pattern)
+
+    # with ignore case the characters may match in another case
+    if parsed.state.flags & re.IGNORECASE:
+        return b''
+
+    # any other node (repeat, class, group, branch, ..) ends the run of literals
+    runs = [b'']
+    for op, value in parsed:
+        if op == sre_constants.LITERAL:
+            runs[-1] += bytes([value])
+        else:
+            runs.append(b'')
+
+    return max(runs, key=len)
+
+def grepFile(args):
+    """
+        Description:
+            Searches the content of one file for a pattern, used by the grep process pool.
+        Parameters:
+            args (tuple): (path, source, regex, literal)
+                - path      => the path of the file.
+                - source    => the sha1 hash of the blob to read from the db, or None to read the file from disk.
+                - regex     => the compiled pattern, or None if the pattern is the literal.
+                - literal   => a string every matching line contains, b'' if there is none.
+        Return:
+            (tuple): (path, matches, binary) where matches is the list of the matching lines.
+    """
+    path, source, regex, literal = args
+
+    if source is None:
+        data = readFile(path)
+    else:
+        # the blobs added before the objects were written to the db are missing
+        if not os.path.exists(os.path.join('.git', 'objects', source[:2], source[2:])):
+            raise ValueError('The object %s of %s is missing, add the file again.' % (source, path))
+        _, data = getObject(source)
+
+    # search the whole file for the literal before splitting it to lines, most of the files don't match
+    if literal and literal not in data:
+        return (path, [], False)
+
+    if regex is None:
+        match = lambda line: literal in line
+    else:
+        match = regex.search
+
+    matches = [line for line in data.splitlines() if match(line)]
+    if not matches:
+        return (path, [], False)
+
+    # don't print the lines of binary files
+    if b'\x00' in data:
+        return (path, [], True)
+
+    return (path, matches, False)
+
+def printGrepMatches(results, prefix):
+    """
+        Description:
+            Prints the grep results in order.
+        Parameters:
+            results (iterable): the (path, matches, binary) tuples returned by grepFile.
+            prefix (string): the string to print before each path.
+        Return:
+            found (boolean): true if any line matched, otherwise false.
+    """
+    found = False
+    for path, matches, binary in results:
+        if binary:
+            print('Binary file', prefix + path, 'matches')
+            found = True
+        for line in matches:
+            print(prefix + path + ':' + line.decode(errors='replace'))
+            found = True
+
+    return found
+
+def grep(pattern, commit=None):
+    """
+        Description:
+            Prints the lines of the tracked files matching a pattern.
+            The files are taken from the index, or from the tree of a commit, and searched in parallel.
+        Parameters:
+            pattern (string): the pattern to search for, a regular expression.
+            [commit] (SHA-1 string): the first 3 or more chars of a commit hash to search, None by default to search the index.
+        Return:
+            found (boolean): true if any line matched, otherwise false.
+    """
+    pattern = pattern.encode()
+
+    # a pattern without regex special characters is searched as a literal string
+    if not re.search(rb'[.^$*+?{}\[\]\\|()]', pattern):
+        regex = None
+        literal = pattern
+    else:
+        try:
+            regex = re.compile(pattern)
+        except re.error as error:
+            raise ValueError('Invalid pattern %s: %s' % (pattern.decode(), error))
+        literal = grepLiteral(pattern)
+    
+    # get the files and where to read them from
+    files = []
+    if commit is None:
+        # the files modified after the index was written, in the same timestamp, are racy
+        try:
+            index_mtime = os.stat(os.path.join('.git', 'index')).st_mtime_ns
+        except FileNotFoundError:
+            index_mtime = 0
+
+        for entry in getCache():
+            # skip the directories collapsed by the sparse checkout
+            if isSparseDir(entry):
+                continue
+
+            # read the files that didn't change since they were added from the disk, otherwise from the db
+            mtime = entry.mtime_s * 10**9 + entry.mtime_n
+            ctime = entry.ctime_s * 10**9 + entry.ctime_n
+            try:
+                st = os.stat(entry.path)
+                clean = (st.st_mtime_ns == mtime and st.st_ctime_ns == ctime
+                        and st.st_size == entry.size and st.st_ino & 0xFFFFFFFF == entry.ino
+                        and mtime < index_mtime)
+            except FileNotFoundError:
+                clean = False
+            files.append((entry.path, None if clean else entry.sha1.hex(), regex, literal))
+        files.sort()
+    else:
+        files = [(path, sha1, regex, literal) for path, sha1 in getTreeFiles(commit)]
+
+    prefix = commit + ':' if commit else ''
+
+    if len(files) < GREP_PARALLEL_MIN_FILES:
+        return printGrepMatches(map(grepFile, files), prefix)
+
+    # search the files in parallel, imap keeps the results in the files order
+    with multiprocessing.Pool() as pool:
+        return printGrepMatches(pool.imap(grepFile, files, chunksize=16), prefix)
@@ -10,7 +10,7 @@ import stat
 
 from helpers import *
 
-from gitCache import getCache
+from gitCache import getCache, CacheEntry, getSparseCone, isConeDir, isSparseDir, SPARSE_DIR_MODE
 
 
 
@@ -128,12 +128,13 @@ def getTree(obj_hash_prefix=None, data=None):
         
     i = 0
     entries = []
-    for _ in range(1000):
+    while i < len(data):
         end = data.find(b'\x00', i)
         if end == -1:
             break
 
-        mode, path = data[i:end].decode().split()
+        # the path may contain spaces, only the first space separates it from the mode
+        mode, path = data[i:end].decode().split(' ', 1)
         mode = int(mode, 8)
         digest = data[end + 1:end + 21]
         entries.append((mode, path, digest.hex()))
@@ -141,27 +142,154 @@ def getTree(obj_hash_prefix=None, data=None):
 
     return entries
 
-def writeTree():
+def hashTree(entries, write=False):
     """
         Description: 
-            Writes a tree from the cache to the db.
+            Hashes a tree from a list of cache entries, 
+            the entries inside directories are hashed into sub trees, and the sparse directories are used as they are.
         Parameters:
-            None.
+            entries (list): list of entries in the format of CacheEntry, with paths relative to the tree.
+            [write] (boolean): if true -> write the tree objects to the db, false by default.
         Return:
             obj_hash (SHA-1 string)): generated hash of the tree object.
     """
-    tree_entries = []
+    # split the entries to the files directly in the tree, and the entries of each sub directory
+    files = {}
+    sub_dirs = {}
+    for entry in entries:
+        path = entry.path.rstrip('/')
+        if '/' in path:
+            name, rest = path.split('/', 1)
+            sub_dirs.setdefault(name, []).append(entry._replace(path=rest + entry.path[len(path):]))
+        elif isSparseDir(entry):
+            files[path + '/'] = (SPARSE_DIR_MODE, path, entry.sha1)
+        else:
+            files[path] = (entry.mode, path, entry.sha1)
+
+    for name, sub_entries in sub_dirs.items():
+        files[name + '/'] = (SPARSE_DIR_MODE, name, bytes.fromhex(hashTree(sub_entries, write)))
 
-    for entry in getCache():
-        mode_path = '{:o} {}'.format(entry.mode, entry.path).encode()
+    # git sorts the tree entries by name, where the directories names end with '/'
+    tree_entries = []
+    for key in sorted(files):
+        mode, name, sha1 = files[key]
+        mode_path = '{:o} {}'.format(mode, name).encode()
 
         # create the entry object
-        object = mode_path + b'\x00' + entry.sha1
+        object = mode_path + b'\x00' + sha1
         tree_entries.append(object)
 
-    obj_hash = generate_object_hash(b''.join(tree_entries), 'tree')
+    obj_hash = generate_object_hash(b''.join(tree_entries), 'tree', write=write)
     return obj_hash
 
+def writeTree(write=False):
+    """
+        Description: 
+            Writes a tree from the cache to the db.
+        Parameters:
+            [write] (boolean): if true -> write the tree objects to the db, false by default.
+        Return:
+            obj_hash (SHA-1 string)): generated hash of the tree object.
+    """
+    return hashTree(getCache(), write)
+
+def getTreeFiles(obj_hash_prefix, prefix=''):
+    """
+        Description: 
+            Lists all the files inside a tree and its sub trees, given the tree or commit hash prefix.
+        Parameters:
+            obj_hash_prefix (SHA-1 string)): the first 3 or more chars of a tree or commit sha1 hash string.
+            [prefix] (string): the path of the tree, prepended to the files paths, '' by default.
+        Return:
+            files (list): list of (path, sha1) tuples of the files, sorted by path.
+    """
+    type, data = getObject(obj_hash_prefix)
+
+    # if the object is a commit -> get the tree hash from the first line of the commit
+    if type == 'commit':
+        obj_hash_prefix = data.split(b'\n', 1)[0].decode().split()[1]
+    elif type != 'tree':
+        raise Exception('expected a tree or commit object, got %s' % type)
+
+    files = []
+    for mode, path, sha1 in getTree(obj_hash_prefix):
+        if stat.S_ISDIR(mode):
+            files.extend(getTreeFiles(sha1, prefix + path + '/'))
+        else:
+            files.append((prefix + path, sha1))
+
+    return sorted(files)
+
+def sparseCollapseDir(path, cone):
+    """
+        Description: 
+            Gets the top-most directory of a path that is outside the sparse cone.
+        Parameters:
+            path (string): the path of a cache entry, ends with '/' if it's a sparse directory.
+            cone (set): the cone directories, None if the sparse checkout isn't enabled.
+        Return:
+            directory (string): the directory to collapse the entry into, or None if the entry is in the cone.
+    """
+    parts = path.rstrip('/').split('/')
+
+    # a sparse directory can be collapsed into itself, a file only into one of its parents
+    end = len(parts) + 1 if path.endswith('/') else len(parts)
+    for i in range(1, end):
+        directory = '/'.join(parts[:i])
+        if not isConeDir(directory, cone):
+            return directory
+    return None
+
+def sparseIndex(entries, cone=None):
+    """
+        Description: 
+            Fits the cache entries to the sparse cone, 
+            the sparse directories inside the cone are expanded to their files from the db, 
+            and the entries outside the cone are collapsed into one sparse directory entry for each top-most directory.
+        Parameters:
+            entries (list): list of entries in the format of CacheEntry.
+            [cone] (set): the cone directories, None by default to expand all the sparse directories.
+        Return:
+            entries (list): list of the sparse cache entries, sorted by path.
+    """
+    # expand the sparse directories that are in the cone
+    expanded = []
+    pending = list(entries)
+    while pending:
+        entry = pending.pop()
+        if not isSparseDir(entry) or sparseCollapseDir(entry.path, cone) is not None:
+            expanded.append(entry)
+            continue
+
+        for mode, name, sha1 in getTree(entry.sha1.hex()):
+            if mode == SPARSE_DIR_MODE:
+                name += '/'
+            path = entry.path + name
+            pending.append(CacheEntry(0, 0, 0, 0, 0, 0, mode, 0, 0, 0, bytes.fromhex(sha1), min(len(path.encode()), 0xFFF), path))
+
+    # collapse the entries outside the cone
+    collapsed = {}
+    sparse_entries = []
+    for entry in expanded:
+        directory = sparseCollapseDir(entry.path, cone)
+        if directory is None:
+            sparse_entries.append(entry)
+        else:
+            collapsed.setdefault(directory, []).append(entry._replace(path=entry.path[len(directory) + 1:]))
+
+    for directory, dir_entries in collapsed.items():
+        # a single sparse directory is already collapsed
+        if len(dir_entries) == 1 and dir_entries[0].path == '':
+            sparse_entries.append(dir_entries[0]._replace(path=directory + '/'))
+            continue
+
+        # write the sub tree to the db, so it can be expanded later
+        sha1 = hashTree(dir_entries, write=True)
+        path = directory + '/'
+        sparse_entries.append(CacheEntry(0, 0, 0, 0, 0, 0, SPARSE_DIR_MODE, 0, 0, 0, bytes.fromhex(sha1), min(len(path.encode()), 0xFFF), path))
+
+    return sorted(sparse_entries, key=lambda entry: entry.path)
+
 def cat_file(mode, obj_hash_prefix):
     """
         Description: 
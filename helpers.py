@@ -1,5 +1,9 @@
+import os
+
 import hashlib
 
+import zlib
+
 
 def readFile(path):
     """Read contents of file at given path as bytes."""
@@ -12,13 +16,14 @@ def writeFile(path, data):
     with open(path, 'wb') as f:
         f.write(data)
 
-def generate_object_hash(data, type):
+def generate_object_hash(data, type, write=False):
     """
         Description:
             Generates hash of the object including the data and it's header.
         Parameters:
             data (str): the object data
             type (str): the object type which is one of three types (blob, commit, tree) 
+            [write] (boolean): if true -> write the compressed object to .git/objects, false by default.
         Return:
             sha1 (SHA-1 string)): hashed object of the header and data.
     """
@@ -32,4 +37,11 @@ def generate_object_hash(data, type):
     # hash the object using sha1
     sha1 = hashlib.sha1(obj).hexdigest()
 
+    # write the object to .git/objects/sha1[:2]/sha1[2:] if it doesn't exist
+    if write:
+        obj_path = os.path.join('.git', 'objects', sha1[:2], sha1[2:])
+        if not os.path.exists(obj_path):
+            os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+            writeFile(obj_path, zlib.compress(obj))
+
     return sha1
\ No newline at end of file
@@ -4,12 +4,17 @@ import sys
 
 import argparse
 
+import multiprocessing
+
 from gitCommands import *
 
 from gitObjects import cat_file
 
 
 if __name__ == '__main__':
+    # the grep worker processes of a frozen binary must not run the command line again
+    multiprocessing.freeze_support()
+
     parser = argparse.ArgumentParser()
 
     sub_parsers = parser.add_subparsers(dest='command', metavar='command')
@@ -44,6 +49,15 @@ if __name__ == '__main__':
     sub_parser.add_argument('-m', '--message', required=True,
             help='text of commit message')
 
+    sub_parser = sub_parsers.add_parser('grep',
+            help='print lines of tracked files matching a pattern')
+
+    sub_parser.add_argument('pattern',
+            help='regular expression to search for')
+
+    sub_parser.add_argument('commit', nargs='?',
+            help='SHA-1 hash (or hash prefix) of commit to search (searches index by default)')
+
     sub_parser = sub_parsers.add_parser('hash-object',
             help='hash contents of given path (and optionally write to '
                  'object store)')
@@ -67,6 +81,15 @@ if __name__ == '__main__':
     sub_parser = sub_parsers.add_parser('ls-files',
             help='list files in index')
 
+    sub_parser = sub_parsers.add_parser('sparse-checkout',
+            help='limit the index and working copy commands to a cone of directories')
+
+    sub_parser.add_argument('action', choices=['set', 'list', 'disable'],
+            help='set the cone directories, list them, or disable the sparse checkout')
+
+    sub_parser.add_argument('directories', nargs='*', metavar='directory',
+            help='directories of the cone (for set)')
+
     sub_parser = sub_parsers.add_parser('status',
             help='show status of working copy')
 
@@ -85,6 +108,15 @@ if __name__ == '__main__':
     elif args.command == 'commit':
         commit(args.message, author=args.author)
 
+    elif args.command == 'grep':
+        try:
+            found = grep(args.pattern, args.commit)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            sys.exit(2)
+        if not found:
+            sys.exit(1)
+
     elif args.command == 'hash-object':
         sha1 = generate_object_hash(readFile(args.path), args.type, write=args.write)
         print(sha1)
@@ -95,6 +127,9 @@ if __name__ == '__main__':
     elif args.command == 'ls-files':
         listFiles()
 
+    elif args.command == 'sparse-checkout':
+        sparseCheckout(args.action, args.directories)
+
     elif args.command == 'status':
         status()
 